@@ -5,6 +5,7 @@ let
     ps: with ps; [
       cryptography
       argon2-cffi
+      orjson
       pyzipper
     ]
   );
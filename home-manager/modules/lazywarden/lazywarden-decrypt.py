@@ -8,18 +8,24 @@ Usage:
 
 import argparse
 import base64
-import json
 import os
 import shutil
 import sys
+from fnmatch import fnmatch
 from getpass import getpass
 from pathlib import Path
+from typing import BinaryIO
 
+import orjson
 import pyzipper
 from argon2.low_level import Type, hash_secret_raw
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
+CHUNK_SIZE = 1024 * 1024
+HEADER_SIZE = 32
+BASE64_WHITESPACE = b" \t\r\n"
+
 
 def derive_key(password: str, salt: bytes) -> bytes:
     """Derive the AES-256 key using Lazywarden's Argon2 parameters."""
@@ -34,20 +40,42 @@ def derive_key(password: str, salt: bytes) -> bytes:
     )
 
 
-def decrypt_blob(blob: bytes, encryption_password: str) -> bytes:
-    """Decrypt a Lazywarden AES-CFB JSON blob."""
-    data = base64.urlsafe_b64decode(blob)
-    if len(data) < 33:
+def decrypt_stream(source: BinaryIO, encryption_password: str) -> bytearray:
+    """Decrypt a Lazywarden AES-CFB JSON blob read incrementally from a file."""
+    plaintext = bytearray()
+    header = b""
+    pending = b""
+    decryptor = None
+
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        pending += chunk.translate(None, BASE64_WHITESPACE)
+        usable = len(pending) if not chunk else len(pending) - len(pending) % 4
+        data = base64.urlsafe_b64decode(pending[:usable])
+        pending = pending[usable:]
+
+        if decryptor is None:
+            header += data
+            if len(header) < HEADER_SIZE:
+                if not chunk:
+                    break
+                continue
+            salt = header[:16]
+            iv = header[16:HEADER_SIZE]
+            data = header[HEADER_SIZE:]
+            key = derive_key(encryption_password, salt)
+            cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
+            decryptor = cipher.decryptor()
+
+        plaintext += decryptor.update(data)
+        if not chunk:
+            break
+
+    if decryptor is None or not plaintext:
         raise ValueError("encrypted blob is too short")
 
-    salt = data[:16]
-    iv = data[16:32]
-    ciphertext = data[32:]
-
-    key = derive_key(encryption_password, salt)
-    cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
-    decryptor = cipher.decryptor()
-    return decryptor.update(ciphertext) + decryptor.finalize()
+    plaintext += decryptor.finalize()
+    return plaintext
 
 
 def ensure_private_directory(path: Path) -> None:
@@ -55,12 +83,20 @@ def ensure_private_directory(path: Path) -> None:
     path.chmod(0o700)
 
 
-def safe_extract_zip(zip_file: pyzipper.AESZipFile, destination: Path, password: bytes) -> list[Path]:
+def safe_extract_zip(
+    zip_file: pyzipper.AESZipFile,
+    destination: Path,
+    password: bytes,
+    skip: frozenset[str] = frozenset(),
+) -> list[Path]:
     """Extract zip members while preventing path traversal."""
     extracted = []
     destination_root = destination.resolve()
 
     for member in zip_file.infolist():
+        if member.filename in skip:
+            continue
+
         target = (destination / member.filename).resolve()
         if destination_root != target and destination_root not in target.parents:
             raise ValueError(f"refusing unsafe zip member path: {member.filename}")
@@ -86,23 +122,32 @@ def find_single_file(directory: Path, pattern: str, description: str) -> Path |
     return matches[0] if matches else None
 
 
-def decrypt_backup_json(output_dir: Path, encryption_password: str, cleanup: bool) -> Path:
-    encrypted_json = find_single_file(output_dir, "*.json", "encrypted JSON")
-    if encrypted_json is None:
-        raise FileNotFoundError("no JSON file found in extracted backup")
-
-    plaintext = decrypt_blob(encrypted_json.read_bytes(), encryption_password)
-    data = json.loads(plaintext)
+def find_single_member(
+    zip_file: pyzipper.AESZipFile, pattern: str, description: str
+) -> pyzipper.ZipInfo | None:
+    matches = sorted(
+        (
+            member
+            for member in zip_file.infolist()
+            if "/" not in member.filename and fnmatch(member.filename, pattern)
+        ),
+        key=lambda member: member.filename,
+    )
+    if len(matches) > 1:
+        names = ", ".join(member.filename for member in matches)
+        raise ValueError(f"found multiple {description} files: {names}")
+    return matches[0] if matches else None
 
-    decrypted_json = output_dir / f"{encrypted_json.stem}_decrypted.json"
-    with open(decrypted_json, "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=2, sort_keys=True)
-        file.write("\n")
-    decrypted_json.chmod(0o600)
 
-    if cleanup:
-        encrypted_json.unlink()
+def decrypt_backup_json(source: BinaryIO, name: str, output_dir: Path, encryption_password: str) -> Path:
+    plaintext = decrypt_stream(source, encryption_password)
+    data = orjson.loads(plaintext)
 
+    decrypted_json = output_dir / f"{Path(name).stem}_decrypted.json"
+    decrypted_json.write_bytes(
+        orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+    )
+    decrypted_json.chmod(0o600)
     return decrypted_json
 
 
@@ -142,7 +187,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--cleanup",
         action="store_true",
-        help="Remove encrypted extracted JSON/attachment ZIP files after successful processing.",
+        help="Do not keep the encrypted JSON or attachments ZIP after successful processing.",
     )
     parser.add_argument(
         "--no-attachments",
@@ -170,10 +215,25 @@ def main() -> int:
 
     try:
         with pyzipper.AESZipFile(backup_zip) as zip_file:
-            extracted = safe_extract_zip(zip_file, output_dir, zip_password)
-        print(f"Extracted {len(extracted)} file(s) to: {output_dir}")
+            json_member = find_single_member(zip_file, "*.json", "encrypted JSON")
+            if json_member is None:
+                raise FileNotFoundError("no JSON file found in backup ZIP")
+
+            # With --cleanup the encrypted JSON would be deleted right away, so
+            # decrypt it straight from the archive instead of writing it out.
+            skip = frozenset({json_member.filename}) if args.cleanup else frozenset()
+            extracted = safe_extract_zip(zip_file, output_dir, zip_password, skip)
+            print(f"Extracted {len(extracted)} file(s) to: {output_dir}")
+
+            if args.cleanup:
+                source = zip_file.open(json_member, pwd=zip_password)
+            else:
+                source = open(output_dir / json_member.filename, "rb")
+            with source:
+                decrypted_json = decrypt_backup_json(
+                    source, json_member.filename, output_dir, encryption_password
+                )
 
-        decrypted_json = decrypt_backup_json(output_dir, encryption_password, args.cleanup)
         print(f"Decrypted JSON saved to: {decrypted_json}")
 
         if not args.no_attachments: